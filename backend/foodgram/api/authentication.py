@@ -0,0 +1,60 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Токен-аутентификация с кэшированием проверки токена.
+
+    В кэше по хэшу ключа хранятся только id пользователя и is_active:
+    ни ключ, ни данные пользователя туда не попадают. Пользователь
+    загружается по первичному ключу без пароля и денормализованных
+    счётчиков, чтобы save() не перезаписал счётчики устаревшими значениями.
+    """
+
+    deferred_fields = ('password', 'recipes_count', 'followers_count')
+
+    @staticmethod
+    def cache_key(key):
+        return f'auth_token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+    @classmethod
+    def invalidate(cls, *keys):
+        cache_keys = [cls.cache_key(key) for key in keys]
+        if cache_keys:
+            transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+        cache_key = self.cache_key(key)
+        cached = cache.get(cache_key)
+        token = None
+        if cached is None:
+            try:
+                token = model.objects.select_related('user').defer(*(
+                    f'user__{field}' for field in self.deferred_fields
+                )).get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            cached = (token.user_id, token.user.is_active)
+            cache.set(cache_key, cached, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        user_id, is_active = cached
+        if not is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        if token is None:
+            user = get_user_model().objects.defer(
+                *self.deferred_fields
+            ).filter(id=user_id).first()
+            if user is None:
+                cache.delete(cache_key)
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            token = model(key=key, user=user)
+        return (token.user, token)
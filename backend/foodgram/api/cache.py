@@ -0,0 +1,60 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+from recipes.cache import get_generation
+
+
+class CachedResponseMixin:
+    """Кэш готовых JSON-ответов для справочников, доступных только на чтение.
+
+    Ключ включает поколение модели, поэтому любое изменение данных
+    делает старые записи недостижимыми без явного удаления.
+    """
+
+    def get_response_cache_key(self, request):
+        generation = get_generation(self.queryset.model._meta.model_name)
+        path = hashlib.md5(
+            request.get_full_path().encode()
+        ).hexdigest()
+        return f'response:{generation}:{path}'
+
+    @staticmethod
+    def is_cacheable(request):
+        return (
+            request.method == 'GET'
+            and 'text/html' not in request.META.get('HTTP_ACCEPT', '')
+        )
+
+    @staticmethod
+    def not_modified(request, etag):
+        return etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+        key = self.get_response_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type, etag = cached
+            if self.not_modified(request, etag):
+                response = HttpResponseNotModified()
+            else:
+                response = HttpResponse(content, content_type=content_type)
+            response['ETag'] = etag
+            return response
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        response.render()
+        etag = f'"{hashlib.md5(response.content).hexdigest()}"'
+        cache.set(
+            key,
+            (response.content, response['Content-Type'], etag),
+            settings.RESPONSE_CACHE_TIMEOUT
+        )
+        response['ETag'] = etag
+        return response
@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.db import connections
+
+
+def check_idle_connections(**kwargs):
+    """Закрыть постоянные соединения, переставшие отвечать.
+
+    Проверяются только соединения, простоявшие дольше
+    DB_HEALTH_CHECK_INTERVAL: под нагрузкой лишнего SELECT 1 нет,
+    а после простоя разорванное сервером соединение не отдаётся запросу.
+    """
+    if not settings.DB_CONN_HEALTH_CHECKS:
+        return
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None:
+            continue
+        idle = now - getattr(connection, 'released_at', now)
+        if idle >= settings.DB_HEALTH_CHECK_INTERVAL and (
+                not connection.is_usable()):
+            connection.close()
+
+
+def mark_released_connections(**kwargs):
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.released_at = now
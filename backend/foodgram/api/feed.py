@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from recipes.cache import get_generation
+from recipes.models import Recipe
+
+
+class RecipeFeed:
+    """Лента рецептов авторов, на которых подписан пользователь.
+
+    В кэше хранится до FEED_SIZE последних id рецептов. Когда появляются
+    новые рецепты (меняется поколение Recipe), список дополняется одним
+    запросом по id больше уже известного, а не собирается заново.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.key = f'feed:{user.id}'
+
+    @staticmethod
+    def invalidate(user_id):
+        transaction.on_commit(lambda: cache.delete(f'feed:{user_id}'))
+
+    def followed_recipes(self):
+        return Recipe.objects.filter(
+            author__following__user=self.user
+        ).order_by('-id').values_list('id', flat=True)
+
+    def ids(self):
+        generation = get_generation(Recipe._meta.model_name)
+        cached = cache.get(self.key)
+        if cached is not None and cached['generation'] == generation:
+            return cached['ids']
+        if cached is None:
+            ids = list(self.followed_recipes()[:settings.FEED_SIZE])
+        else:
+            ids = cached['ids']
+            newer = self.followed_recipes().filter(id__gt=ids[0] if ids else 0)
+            ids = (list(newer[:settings.FEED_SIZE]) + ids)[:settings.FEED_SIZE]
+        cache.set(
+            self.key,
+            {'generation': generation, 'ids': ids},
+            settings.FEED_TIMEOUT
+        )
+        return ids
+
+    def page(self, before, limit):
+        """id рецептов страницы, идущих после курсора before."""
+        ids = self.ids()
+        truncated = len(ids) >= settings.FEED_SIZE
+        if before is not None:
+            ids = [recipe_id for recipe_id in ids if recipe_id < before]
+        page = ids[:limit]
+        if len(page) < limit and truncated:
+            last = page[-1] if page else before
+            page += list(
+                self.followed_recipes().filter(id__lt=last)[:limit - len(page)]
+            )
+        return page
@@ -1,14 +1,19 @@
+from django.conf import settings
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
-from rest_framework.filters import SearchFilter
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
 
-from recipes.models import Recipe, Tag
+from recipes.catalogue import ingredient_catalogue, tag_catalogue
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.search import recipe_search
+from .pagination import RecipeCursorPagination
 
 
 class RecipeFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all(),
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_catalogue.choices,
+        method='filter_tags'
     )
 
     is_favorited = filters.BooleanFilter(
@@ -17,23 +22,70 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(
+        method='filter_search'
+    )
 
     class Meta:
         model = Recipe
         fields = ['tags', 'author', ]
 
-    def filter_is_favorited(self, queryset, name, value):
-        user = self.request.user
-        if value and not user.is_anonymous:
-            return queryset.filter(favorite__user=user)
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        ids = tag_catalogue.ids_by_slug()
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'),
+            tag_id__in=[ids[slug] for slug in value]
+        )))
+
+    def filter_user_recipes(self, queryset, model, value):
+        if value and not self.request.user.is_anonymous:
+            return queryset.filter(Exists(model.objects.filter(
+                user=self.request.user, recipe=OuterRef('pk')
+            )))
         return queryset
 
+    def filter_is_favorited(self, queryset, name, value):
+        return self.filter_user_recipes(queryset, Favorite, value)
+
     def filter_is_in_shopping_cart(self, queryset, name, value):
-        user = self.request.user
-        if value and not user.is_anonymous:
-            return queryset.filter(shopping_cart__user=user)
-        return queryset
+        return self.filter_user_recipes(queryset, ShoppingCart, value)
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск, результаты упорядочены по релевантности.
 
+        Курсор упорядочивает выдачу по id и отбросил бы релевантность,
+        поэтому вместе с ?cursor= поиск не принимается.
+        """
+        value = value.strip()
+        if not value:
+            return queryset
+        cursor_param = RecipeCursorPagination.cursor_query_param
+        if cursor_param in self.request.query_params:
+            raise ValidationError({
+                name: f'Поиск нельзя сочетать с параметром {cursor_param}, '
+                      'используйте постраничную выдачу.'
+            })
+        return recipe_search.filter(queryset, value)
 
-class IngredientFilter(SearchFilter):
+
+class IngredientFilter(BaseFilterBackend):
+    """Автодополнение: сначала совпадения по началу, затем по подстроке."""
     search_param = 'name'
+
+    def filter_queryset(self, request, queryset, view):
+        name = request.query_params.get(self.search_param, '').strip()
+        if not name:
+            return queryset
+        limit = settings.INGREDIENTS_SEARCH_LIMIT
+        if settings.INGREDIENTS_CATALOGUE_CACHE:
+            return ingredient_catalogue.search(name, limit)
+        found = list(
+            queryset.filter(name__startswith=name.lower())[:limit]
+        )
+        if len(found) < limit:
+            found += queryset.filter(name__icontains=name).exclude(
+                id__in=[ingredient.id for ingredient in found]
+            )[:limit - len(found)]
+        return found
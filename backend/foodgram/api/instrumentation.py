@@ -0,0 +1,192 @@
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+METRICS = (
+    ('requests_total', 'counter', 'Количество запросов'),
+    ('db_queries_total', 'counter', 'Количество SQL-запросов'),
+    ('db_seconds_total', 'counter', 'Время в базе данных, с'),
+    ('view_seconds_total', 'counter',
+     'Время представления без SQL: сериализация и логика, с'),
+    ('render_seconds_total', 'counter',
+     'Время рендеринга данных в байты, для ответов из кэша 0, с'),
+    ('request_seconds_total', 'counter', 'Полное время обработки, с'),
+    ('response_bytes_total', 'counter', 'Размер ответов, байт'),
+    ('repeated_queries_total', 'counter',
+     'Запросы с повторяющимися SQL-шаблонами (N+1)'),
+)
+
+
+class MetricsRegistry:
+    """Накопленные по эндпоинтам метрики процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = defaultdict(Counter)
+
+    def observe(self, endpoint, **values):
+        with self._lock:
+            self._values[endpoint].update(values)
+
+    def render(self):
+        with self._lock:
+            values = {
+                endpoint: dict(counter)
+                for endpoint, counter in self._values.items()
+            }
+        lines = []
+        for metric, kind, description in METRICS:
+            name = f'foodgram_{metric}'
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            for endpoint in sorted(values):
+                lines.append(
+                    f'{name}{{endpoint="{endpoint}"}} '
+                    f'{values[endpoint].get(metric, 0)}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class QueryRecorder:
+    """Обёртка execute: считает запросы, время и SQL-шаблоны."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.templates = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.templates[sql] += 1
+
+    def repeated(self, threshold):
+        return {
+            sql: count for sql, count in self.templates.items()
+            if count >= threshold
+        }
+
+
+def endpoint_name(request, view_func):
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None) or {}
+    method = request.method.lower()
+    return f'{view_class.__name__}.{actions.get(method, method)}'
+
+
+class InstrumentationMiddleware:
+    """Количество и время SQL-запросов, рендеринга и размер ответа.
+
+    Время представления считается от вызова view до возврата ответа
+    за вычетом SQL, в него входит сериализация. Ответы CachedResponseMixin
+    уже содержат байты, и их время рендеринга равно нулю.
+
+    В режиме DEBUG значения добавляются в заголовки ответа, а медленные
+    запросы и повторяющиеся SQL-шаблоны пишутся в лог.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.options = settings.INSTRUMENTATION
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        request._instrumentation = {
+            'endpoint': 'unresolved', 'view_started': None, 'view': None,
+            'render': 0.0,
+        }
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        finished = time.perf_counter()
+        elapsed = finished - started
+        view_started = request._instrumentation['view_started']
+        if request._instrumentation['view'] is None and view_started:
+            request._instrumentation['view'] = finished - view_started
+        self.record(request, response, recorder, elapsed)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._instrumentation['endpoint'] = endpoint_name(
+            request, view_func
+        )
+        request._instrumentation['view_started'] = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        started = time.perf_counter()
+        view_started = request._instrumentation['view_started']
+        if view_started is not None:
+            request._instrumentation['view'] = started - view_started
+
+        def rendered(response):
+            request._instrumentation['render'] = (
+                time.perf_counter() - started
+            )
+        response.add_post_render_callback(rendered)
+        return response
+
+    def record(self, request, response, recorder, elapsed):
+        endpoint = request._instrumentation['endpoint']
+        render = request._instrumentation['render']
+        view = max((request._instrumentation['view'] or 0.0)
+                   - recorder.duration, 0.0)
+        size = 0 if response.streaming else len(response.content)
+        repeated = recorder.repeated(self.options['REPEATED_QUERY_THRESHOLD'])
+        registry.observe(
+            endpoint,
+            requests_total=1,
+            db_queries_total=recorder.count,
+            db_seconds_total=recorder.duration,
+            view_seconds_total=view,
+            render_seconds_total=render,
+            request_seconds_total=elapsed,
+            response_bytes_total=size,
+            repeated_queries_total=int(bool(repeated)),
+        )
+        if elapsed * 1000 >= self.options['SLOW_REQUEST_MS']:
+            logger.warning(
+                'Медленный запрос %s %s (%s): %.1f мс, SQL: %d за %.1f мс',
+                request.method, request.path, endpoint, elapsed * 1000,
+                recorder.count, recorder.duration * 1000
+            )
+        for sql, count in repeated.items():
+            logger.warning(
+                'Повторяющийся SQL в %s (%s): %d раз: %s',
+                request.path, endpoint, count, sql
+            )
+        if self.options['HEADERS']:
+            response['X-DB-Queries'] = recorder.count
+            response['X-Response-Size'] = size
+            response['Server-Timing'] = (
+                f'db;dur={recorder.duration * 1000:.2f}, '
+                f'view;dur={view * 1000:.2f}, '
+                f'render;dur={render * 1000:.2f}, '
+                f'total;dur={elapsed * 1000:.2f}'
+            )
+
+
+def metrics(request):
+    if not settings.INSTRUMENTATION['METRICS']:
+        raise Http404
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
@@ -0,0 +1,167 @@
+import json
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Recipe
+from users.models import CustomUser
+
+SCENARIOS = (
+    ('tags', '/api/tags/', False),
+    ('ingredients', '/api/ingredients/', False),
+    ('ingredients_search', '/api/ingredients/?name=ин', False),
+    ('recipes', '/api/recipes/', False),
+    ('recipes_auth', '/api/recipes/', True),
+    ('recipes_deep_page', '/api/recipes/?page=50', True),
+    ('recipes_cursor', '/api/recipes/?cursor=', True),
+    ('recipes_tags', '/api/recipes/?tags=breakfast&tags=lunch', True),
+    ('recipes_favorited', '/api/recipes/?is_favorited=1', True),
+    ('recipes_in_cart', '/api/recipes/?is_in_shopping_cart=1', True),
+    ('recipe_detail', '/api/recipes/{recipe}/', True),
+    ('subscriptions', '/api/users/subscriptions/?recipes_limit=3', True),
+    ('download_shopping_cart', '/api/recipes/download_shopping_cart/', True),
+    ('shopping_list', '/api/recipes/shopping_list/', True),
+    ('users', '/api/users/', True),
+)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[round(fraction * (len(ordered) - 1))]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Замер задержки, числа SQL-запросов и пропускной способности API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', default=50, type=int)
+        parser.add_argument('--warmup', default=5, type=int)
+        parser.add_argument('--only', nargs='*', default=None,
+                            help='Запустить только указанные сценарии')
+        parser.add_argument('--user', default=None,
+                            help='username для авторизованных запросов')
+        parser.add_argument('--output', default=None,
+                            help='Сохранить результаты в JSON')
+        parser.add_argument('--compare', default=None,
+                            help='JSON с базовыми результатами')
+        parser.add_argument('--threshold', default=10.0, type=float,
+                            help='Допустимое ухудшение p95, %%')
+
+    def get_user(self, username):
+        users = CustomUser.objects.order_by('-followers_count', 'id')
+        if username:
+            users = users.filter(username=username)
+        user = users.first()
+        if user is None:
+            raise CommandError(
+                'Нет пользователей: сначала выполните generate_data'
+            )
+        return user
+
+    def request(self, client, path, headers):
+        response = client.get(path, **headers)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def run_scenario(self, client, path, headers, options):
+        for _ in range(options['warmup']):
+            self.request(client, path, headers)
+        latencies = []
+        queries = []
+        status = None
+        started = time.perf_counter()
+        for _ in range(options['iterations']):
+            with CaptureQueriesContext(connection) as context:
+                request_started = time.perf_counter()
+                status = self.request(client, path, headers).status_code
+                latencies.append(time.perf_counter() - request_started)
+            queries.append(len(context.captured_queries))
+        elapsed = time.perf_counter() - started
+        return {
+            'path': path,
+            'status': status,
+            'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+            'queries': round(sum(queries) / len(queries), 2),
+            'rps': round(options['iterations'] / elapsed, 1),
+        }
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должен быть больше нуля')
+        user = self.get_user(options['user'])
+        token, _ = Token.objects.get_or_create(user=user)
+        recipe = Recipe.objects.order_by('id').values_list(
+            'id', flat=True
+        ).first()
+        client = Client()
+        results = {}
+        for name, path, auth in SCENARIOS:
+            if options['only'] and name not in options['only']:
+                continue
+            headers = {}
+            if auth:
+                headers['HTTP_AUTHORIZATION'] = f'Token {token.key}'
+            results[name] = self.run_scenario(
+                client, path.format(recipe=recipe), headers, options
+            )
+            self.stdout.write(
+                '{name:<24} {status} p50 {p50_ms:>8.2f} мс  '
+                'p95 {p95_ms:>8.2f} мс  SQL {queries:>6}  '
+                '{rps:>8} зап/с'.format(name=name, **results[name])
+            )
+        report = {
+            'revision': git_revision(),
+            'created': datetime.now(timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'counts': {
+                'users': CustomUser.objects.count(),
+                'recipes': Recipe.objects.count(),
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['compare']:
+            self.compare(options['compare'], results, options['threshold'])
+
+    def compare(self, filename, results, threshold):
+        with open(filename, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+        regressions = []
+        for name, current in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            change = (
+                (current['p95_ms'] - previous['p95_ms'])
+                / max(previous['p95_ms'], 1e-6) * 100
+            )
+            self.stdout.write(
+                f'{name:<24} p95 {previous["p95_ms"]:.2f} -> '
+                f'{current["p95_ms"]:.2f} мс ({change:+.1f}%), SQL '
+                f'{previous["queries"]} -> {current["queries"]}'
+            )
+            if change > threshold or current['queries'] > previous['queries']:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(f'Регрессия: {", ".join(regressions)}')
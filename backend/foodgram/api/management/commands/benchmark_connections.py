@@ -0,0 +1,105 @@
+import io
+import time
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+from .benchmark_api import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Пропускная способность с новым соединением на каждый запрос '
+        'и с постоянными соединениями'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', default=200, type=int)
+        parser.add_argument('--path', action='append', default=None,
+                            help='Эндпоинт, можно указать несколько раз')
+        parser.add_argument(
+            '--conn-max-age', default=60, type=int,
+            help='CONN_MAX_AGE для режима с переиспользованием'
+        )
+
+    def request(self, handler, path):
+        url = urlsplit(path)
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': url.path,
+            'QUERY_STRING': url.query,
+            'HTTP_ACCEPT': 'application/json',
+            'wsgi.input': io.BytesIO(),
+        }
+        setup_testing_defaults(environ)
+        statuses = []
+        response = handler(
+            environ, lambda status, headers: statuses.append(status)
+        )
+        try:
+            b''.join(response)
+        finally:
+            # Как WSGI-сервер: close() шлёт request_finished.
+            response.close()
+        return statuses[0]
+
+    def run_mode(self, handler, paths, conn_max_age, iterations):
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+        opened = []
+
+        def count_connection(**kwargs):
+            opened.append(kwargs['connection'].alias)
+        connection_created.connect(count_connection)
+        latencies = []
+        try:
+            started = time.perf_counter()
+            for number in range(iterations):
+                path = paths[number % len(paths)]
+                request_started = time.perf_counter()
+                status = self.request(handler, path)
+                latencies.append(time.perf_counter() - request_started)
+                if not status.startswith('200'):
+                    raise CommandError(f'{path}: {status}')
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(count_connection)
+            connection.close()
+        return {
+            'rps': iterations / elapsed,
+            'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'connections': len(opened),
+        }
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должен быть больше нуля')
+        paths = options['path'] or ['/api/recipes/', '/api/users/']
+        handler = WSGIHandler()
+        configured = connection.settings_dict['CONN_MAX_AGE']
+        results = {}
+        try:
+            for name, conn_max_age in (
+                    ('без переиспользования', 0),
+                    ('постоянные соединения', options['conn_max_age'])):
+                results[name] = self.run_mode(
+                    handler, paths, conn_max_age, options['iterations']
+                )
+                self.stdout.write(
+                    '{name:<24} {rps:>8.1f} зап/с  p50 {p50_ms:>7.2f} мс  '
+                    'p95 {p95_ms:>7.2f} мс  соединений {connections}'.format(
+                        name=name, **results[name]
+                    )
+                )
+        finally:
+            connection.settings_dict['CONN_MAX_AGE'] = configured
+        baseline, pooled = results.values()
+        self.stdout.write(
+            f'Прирост: {pooled["rps"] / baseline["rps"]:.2f}x '
+            f'({connection.vendor})'
+        )
@@ -0,0 +1,82 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import IngredientSerializer
+from api.views import RecipeViewSet
+from recipes.models import Ingredient
+from .benchmark_api import percentile
+
+RENDERERS = (
+    ('json', JSONRenderer),
+    ('orjson', FastJSONRenderer),
+)
+
+
+class Command(BaseCommand):
+    help = 'Сравнение времени сериализации и размера ответов JSON-рендереров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', default=50, type=int)
+        parser.add_argument('--limit', default=100, type=int,
+                            help='Рецептов на странице списка')
+
+    def recipes(self, limit):
+        request = APIRequestFactory().get(
+            '/api/recipes/', {'limit': limit}, HTTP_ACCEPT='application/json'
+        )
+        response = RecipeViewSet.as_view({'get': 'list'})(request)
+        if response.status_code != 200:
+            raise CommandError(
+                f'Список рецептов: статус {response.status_code}'
+            )
+        return response.data
+
+    def ingredients(self, limit):
+        return IngredientSerializer(
+            Ingredient.objects.order_by('name'), many=True
+        ).data
+
+    def measure(self, renderer, data, iterations):
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            content = renderer.render(data, 'application/json')
+            timings.append(time.perf_counter() - started)
+        return {
+            'p50_ms': percentile(timings, 0.5) * 1000,
+            'p95_ms': percentile(timings, 0.95) * 1000,
+            'bytes': len(content),
+        }
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должен быть больше нуля')
+        if orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson не установлен: FastJSONRenderer использует json'
+            ))
+        for name in ('recipes', 'ingredients'):
+            data = getattr(self, name)(options['limit'])
+            results = {
+                renderer_name: self.measure(
+                    renderer(), data, options['iterations']
+                )
+                for renderer_name, renderer in RENDERERS
+            }
+            for renderer_name, result in results.items():
+                self.stdout.write(
+                    '{name:<12} {renderer:<7} p50 {p50_ms:>8.3f} мс  '
+                    'p95 {p95_ms:>8.3f} мс  {bytes:>9} байт'.format(
+                        name=name, renderer=renderer_name, **result
+                    )
+                )
+            baseline, fast = results['json'], results['orjson']
+            self.stdout.write(
+                f'{name:<12} ускорение p50 '
+                f'{baseline["p50_ms"] / max(fast["p50_ms"], 1e-9):.1f}x, '
+                f'экономия {baseline["bytes"] - fast["bytes"]} байт'
+            )
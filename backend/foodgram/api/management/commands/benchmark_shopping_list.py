@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.utils import shopping_cart_rows
+from recipes import shopping_list
+from recipes.models import Recipe, ShoppingCart
+from recipes.units import merge_units
+from users.models import CustomUser
+from .benchmark_api import percentile
+
+
+class Command(BaseCommand):
+    help = 'Замер агрегации списка покупок для большой корзины'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', default=500, type=int,
+                            help='Рецептов в корзине')
+        parser.add_argument('--iterations', default=20, type=int)
+
+    def timed(self, function, iterations):
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            result = function()
+            timings.append(time.perf_counter() - started)
+        return result, (
+            percentile(timings, 0.5) * 1000, percentile(timings, 0.95) * 1000
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должен быть больше нуля')
+        user = CustomUser.objects.order_by('id').first()
+        recipes = list(Recipe.objects.order_by('id').values_list(
+            'id', flat=True
+        )[:options['recipes']])
+        if user is None or len(recipes) < options['recipes']:
+            raise CommandError(
+                'Недостаточно данных: сначала выполните generate_data'
+            )
+        with transaction.atomic():
+            ShoppingCart.objects.filter(user=user).delete()
+            ShoppingCart.objects.bulk_create(
+                ShoppingCart(user=user, recipe_id=recipe) for recipe in recipes
+            )
+            shopping_list.rebuild([user.id])
+            ingredients = shopping_cart_rows(user)
+            rows, sql = self.timed(
+                lambda: list(ingredients.iterator()), options['iterations']
+            )
+            merged, merge = self.timed(
+                lambda: merge_units(rows), options['iterations']
+            )
+            transaction.set_rollback(True)
+        self.stdout.write(
+            f'Рецептов в корзине: {len(recipes)}, строк списка покупок: '
+            f'{len(rows)}, после сведения единиц: {len(merged)}'
+        )
+        for name, (p50, p95) in (('SQL', sql), ('сведение', merge)):
+            self.stdout.write(
+                f'{name:<10} p50 {p50:>8.3f} мс  p95 {p95:>8.3f} мс'
+            )
@@ -0,0 +1,75 @@
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from recipes.cache import bump_generation, get_generation
+from recipes.models import Favorite, ShoppingCart
+
+
+class Memberships:
+    """Множества id рецептов в избранном и в списке покупок пользователя.
+
+    Между запросами множества хранятся в кэше упакованными в массив
+    int64, внутри запроса — как frozenset, поэтому проверка
+    принадлежности рецепта не требует обращений к базе. Ключ содержит
+    версию множества пользователя, которая растёт после коммита
+    изменений: множество, прочитанное до коммита, остаётся под старым
+    ключом и больше не читается.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._sets = {}
+
+    @staticmethod
+    def version_name(user_id, model):
+        return f'memberships:{model._meta.model_name}:{user_id}'
+
+    @classmethod
+    def key(cls, user_id, model):
+        version = get_generation(
+            cls.version_name(user_id, model),
+            settings.MEMBERSHIP_CACHE_TIMEOUT
+        )
+        return f'{cls.version_name(user_id, model)}:{version}'
+
+    @classmethod
+    def invalidate(cls, user_id, model):
+        name = cls.version_name(user_id, model)
+        transaction.on_commit(lambda: bump_generation(name))
+
+    def load(self, model):
+        if self.user.is_anonymous:
+            return frozenset()
+        key = self.key(self.user.id, model)
+        packed = cache.get(key)
+        if packed is None:
+            packed = array('q', model.objects.filter(
+                user=self.user
+            ).values_list('recipe_id', flat=True)).tobytes()
+            cache.set(key, packed, settings.MEMBERSHIP_CACHE_TIMEOUT)
+        ids = array('q')
+        ids.frombytes(packed)
+        return frozenset(ids)
+
+    def recipe_ids(self, model):
+        if model not in self._sets:
+            self._sets[model] = self.load(model)
+        return self._sets[model]
+
+    @property
+    def favorites(self):
+        return self.recipe_ids(Favorite)
+
+    @property
+    def shopping_cart(self):
+        return self.recipe_ids(ShoppingCart)
+
+
+def get_memberships(request):
+    memberships = getattr(request, '_memberships', None)
+    if memberships is None:
+        memberships = request._memberships = Memberships(request.user)
+    return memberships
@@ -0,0 +1,30 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class RecipeCursorPagination(CursorPagination):
+    ordering = '-id'
+    page_size_query_param = 'limit'
+
+
+class RecipePagination(PageNumberPagination):
+    """Постраничная выдача по номеру страницы или, с ?cursor=, по курсору.
+
+    Курсорный режим не считает COUNT(*) и не использует OFFSET,
+    а новые рецепты не сдвигают уже выданные страницы.
+    """
+    page_size_query_param = 'limit'
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        cursor_param = RecipeCursorPagination.cursor_query_param
+        if cursor_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+        self.cursor_paginator = RecipeCursorPagination()
+        return self.cursor_paginator.paginate_queryset(
+            queryset, request, view
+        )
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
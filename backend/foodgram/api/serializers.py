@@ -1,27 +1,60 @@
 import base64
+import binascii
 
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 
+from recipes import shopping_list
+from recipes.images import RENDITIONS, rendition_url
 from recipes.models import (CHOICES, Favorite, Recipe, Ingredient, RecipeIngredient,
                              ShoppingCart, Tag)
 from users.models import CustomUser, Follow
+from .memberships import get_memberships
 
 # Ingredient, RecipeIngredient, в импорт моделей
 
 
 class Base64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'too_large': 'Размер изображения не должен превышать {max_size} байт.',
+    }
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
             format, imgstr = data.split(';base64,')
             ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            if len(imgstr) // 4 * 3 > settings.MAX_IMAGE_SIZE:
+                self.fail('too_large', max_size=settings.MAX_IMAGE_SIZE)
+            try:
+                content = base64.b64decode(imgstr, validate=True)
+            except binascii.Error:
+                self.fail('invalid_image')
+            data = ContentFile(content, name='temp.' + ext)
 
         return super().to_internal_value(data)
 
 
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные WebP-копии изображения."""
+
+    def to_representation(self, image):
+        if not image:
+            return None
+        request = self.context.get('request')
+        renditions = {}
+        for rendition in RENDITIONS:
+            url = rendition_url(image.name, rendition)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            renditions[rendition] = url
+        return renditions
+
+
 class TagSerializer(serializers.ModelSerializer):
     color = serializers.ChoiceField(choices=CHOICES)
 
@@ -33,21 +66,19 @@ class TagSerializer(serializers.ModelSerializer):
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
-        fields = ('id', 'name')
-        # 'measurement_unit')
+        fields = ('id', 'name', 'measurement_unit')
 
 
 class RecipeIngredientGetSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source='ingredient.id')
     name = serializers.ReadOnlyField(source='ingredient.name')
-    # measurement_unit = serializers.ReadOnlyField(
-    #     source='ingredient.measurement_unit'
-    # )
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit'
+    )
 
     class Meta:
         model = RecipeIngredient
-        fields = ('id', 'name', 'amount')
-                  # 'measurement_unit')
+        fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
 class RecipeIngredientPostSerializer(serializers.ModelSerializer):
@@ -60,10 +91,11 @@ class RecipeIngredientPostSerializer(serializers.ModelSerializer):
 
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
+    images = ImageRenditionsField(source='image')
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'images', 'cooking_time')
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
@@ -88,6 +120,22 @@ class FavoriteSerializer(serializers.ModelSerializer):
         ).data
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BATCH_RECIPES_LIMIT
+    )
+
+
+class ShoppingListItemSerializer(serializers.Serializer):
+    name = serializers.CharField(source='ingredient__name')
+    measurement_unit = serializers.CharField(
+        source='ingredient__measurement_unit'
+    )
+    amount = serializers.ReadOnlyField()
+
+
 class CustomUserCreateSerializer(UserCreateSerializer):
 
     class Meta:
@@ -134,6 +182,7 @@ class RecipeGetSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True)
     author = CustomUserSerializer(read_only=True)
     image = Base64ImageField(required=False, allow_null=True)
+    images = ImageRenditionsField(source='image')
     is_favorited = serializers.SerializerMethodField(
         method_name='get_is_favorited',
         read_only=True)
@@ -145,6 +194,7 @@ class RecipeGetSerializer(serializers.ModelSerializer):
             'tags',
             'author',
             'image',
+            'images',
             'name',
             'text',
             'is_favorited',
@@ -157,24 +207,21 @@ class RecipeGetSerializer(serializers.ModelSerializer):
 
     def get_ingredients(self, recipe):
         return RecipeIngredientGetSerializer(
-            RecipeIngredient.objects.filter(recipe=recipe),
+            recipe.recipe_ingredients.all(),
             many=True
         ).data
 
     def get_is_favorited(self, recipe):
-        if self.context.get('request').user.is_anonymous:
+        request = self.context.get('request')
+        if not request or request.user.is_anonymous:
             return False
-        return Favorite.objects.filter(
-            user=self.context.get('request').user,
-            recipe=recipe
-        ).exists()
+        return recipe.id in get_memberships(request).favorites
 
     def get_is_in_shopping_cart(self, obj):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
-        return ShoppingCart.objects.filter(
-            user=request.user, recipe=obj).exists()
+        return obj.id in get_memberships(request).shopping_cart
 
     # def validate(self, data):
     #     ingredients = data.get('ingredients')
@@ -266,45 +313,94 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     #     return data
 
     @staticmethod
-    def create_ingredients(recipe, ingredients):
-        for ingredient in ingredients:
-            RecipeIngredient.objects.bulk_create([RecipeIngredient(
-                recipe=recipe,
-                ingredient=Ingredient.objects.get(id=ingredient['id']),
-                amount=ingredient.get('amount'))
-
-            ])
-
-    @staticmethod
-    def create_tags(tags, recipe):
-        for tag in tags:
-            recipe.tags.add(tag)
+    def get_ingredients_map(ingredients):
+        ingredients_map = Ingredient.objects.in_bulk(
+            {ingredient['id'] for ingredient in ingredients}
+        )
+        missing = {
+            ingredient['id'] for ingredient in ingredients
+        } - set(ingredients_map)
+        if missing:
+            raise serializers.ValidationError({
+                'ingredients': f'Ингредиентов с id {sorted(missing)} нет'
+            })
+        return ingredients_map
 
+    def create_ingredients(self, recipe, ingredients):
+        ingredients_map = self.get_ingredients_map(ingredients)
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=ingredients_map[ingredient['id']],
+                amount=ingredient.get('amount')
+            )
+            for ingredient in ingredients
+        ])
+
+    def update_ingredients(self, recipe, ingredients):
+        existing = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipe_ingredients.all()
+        }
+        new_ingredients = []
+        changed = []
+        deltas = {}
+        for ingredient in ingredients:
+            recipe_ingredient = existing.pop(ingredient['id'], None)
+            if recipe_ingredient is None:
+                new_ingredients.append(ingredient)
+                deltas[ingredient['id']] = ingredient['amount']
+            elif recipe_ingredient.amount != ingredient['amount']:
+                deltas[ingredient['id']] = (
+                    ingredient['amount'] - recipe_ingredient.amount
+                )
+                recipe_ingredient.amount = ingredient['amount']
+                changed.append(recipe_ingredient)
+        for ingredient_id, recipe_ingredient in existing.items():
+            deltas[ingredient_id] = -recipe_ingredient.amount
+        if existing:
+            RecipeIngredient.objects.filter(
+                id__in=[item.id for item in existing.values()]
+            ).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        if new_ingredients:
+            self.create_ingredients(recipe, new_ingredients)
+        shopping_list.change_recipe(recipe.id, deltas)
+
+    def validate_ingredients(self, ingredients):
+        ids = [ingredient['id'] for ingredient in ingredients]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError(
+                'Ингредиенты не должны повторяться!')
+        return ingredients
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        recipe = Recipe.objects.create(
-            author=self.context.get('request').user,
-            **validated_data
+        author = self.context.get('request').user
+        recipe = Recipe.objects.create(author=author, **validated_data)
+        CustomUser.objects.filter(id=author.id).update(
+            recipes_count=F('recipes_count') + 1
         )
-        self.create_tags(tags, recipe)
+        recipe.tags.set(tags)
         self.create_ingredients(recipe, ingredients)
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
-        recipe.tags.clear()
-        RecipeIngredient.objects.filter(recipe=recipe).delete()
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        self.create_tags(tags, recipe)
-        self.create_ingredients(recipe, ingredients)
+        recipe.tags.set(tags)
+        self.update_ingredients(recipe, ingredients)
         return super().update(recipe, validated_data)
 
 
 class FollowListSerializer(serializers.ModelSerializer):
     """ Сериализация списка на кого подписан пользователь"""
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
     is_subscribed = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
@@ -314,9 +410,6 @@ class FollowListSerializer(serializers.ModelSerializer):
             'is_subscribed', 'recipes', 'recipes_count'
         )
 
-    def get_recipes_count(self, following):
-        return Recipe.objects.filter(author=following).count()
-
     def get_recipes(self, following):
         queryset = self.context.get('request')
         recipes_limit = queryset.query_params.get('recipes_limit')
@@ -342,7 +435,7 @@ class FollowSerializer(serializers.ModelSerializer):
         method_name='get_recipes',
         read_only=True
     )
-    recipes_count = serializers.ReadOnlyField(source='recipes.count')
+    recipes_count = serializers.IntegerField(read_only=True)
     is_subscribed = serializers.SerializerMethodField(
         method_name='get_is_subscribed',
         read_only=True)
@@ -362,16 +455,20 @@ class FollowSerializer(serializers.ModelSerializer):
 
     def get_recipes(self, obj):
         request = self.context.get('request')
-        if request.GET.get('recipes_limit'):
-            recipes_limit = int(request.GET.get('recipes_limit'))
-            queryset = Recipe.objects.filter(
-                author__id=obj.id).order_by('id')[:recipes_limit]
+        if hasattr(obj, 'short_recipes'):
+            queryset = obj.short_recipes
         else:
-            queryset = Recipe.objects.filter(
-                following__id=obj.id).order_by('id')
-        return ShortRecipeSerializer(queryset, many=True).data
+            queryset = obj.recipes.order_by('id')
+            recipes_limit = request.GET.get('recipes_limit', '')
+            if recipes_limit.isdigit():
+                queryset = queryset[:int(recipes_limit)]
+        return ShortRecipeSerializer(
+            queryset, many=True, context={'request': request}
+        ).data
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
@@ -0,0 +1,23 @@
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from users.models import CustomUser
+from .authentication import CachedTokenAuthentication
+from .connections import check_idle_connections, mark_released_connections
+
+request_started.connect(check_idle_connections)
+request_finished.connect(mark_released_connections)
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(instance, **kwargs):
+    CachedTokenAuthentication.invalidate(instance.key)
+
+
+@receiver(post_save, sender=CustomUser)
+def forget_user_tokens(instance, **kwargs):
+    CachedTokenAuthentication.invalidate(*Token.objects.filter(
+        user_id=instance.id
+    ).values_list('key', flat=True))
@@ -0,0 +1,309 @@
+import datetime
+from decimal import Decimal
+from unittest import skipIf
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from recipes import shopping_list
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            Tag, UserShoppingListItem)
+from recipes.search import update_search_vectors
+from users.models import CustomUser
+from .renderers import FastJSONRenderer, orjson
+
+
+class RecipeListQueriesTest(TestCase):
+    """Число запросов списка рецептов не зависит от размера страницы."""
+
+    ANONYMOUS_QUERIES = 5
+    AUTHENTICATED_QUERIES = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            CustomUser.objects.create(
+                username=f'user{number}', email=f'user{number}@example.com'
+            )
+            for number in range(3)
+        ]
+        tags = [
+            Tag.objects.create(name=name, color=color, slug=slug)
+            for name, color, slug in (
+                ('Завтрак', '#FBCEB1', 'breakfast'),
+                ('Обед', '#FAE7B5', 'lunch'),
+                ('Ужин', '#9ACEEB', 'dinner'),
+            )
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(10)
+        ]
+        for number in range(25):
+            recipe = Recipe.objects.create(
+                author=cls.users[number % 3], name=f'Рецепт {number}',
+                text='Описание', cooking_time=10,
+                image='recipes/images/recipe.png'
+            )
+            recipe.tags.set(tags[:1 + number % 3])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient=ingredients[(number + shift) % 10],
+                    amount=shift + 1
+                )
+                for shift in range(3)
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_recipes(self, client, limit, queries):
+        with self.assertNumQueries(queries):
+            response = client.get('/api/recipes/', {'limit': limit})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), limit)
+
+    def test_anonymous(self):
+        for limit in (1, 20):
+            with self.subTest(limit=limit):
+                self.get_recipes(APIClient(), limit, self.ANONYMOUS_QUERIES)
+
+    def test_authenticated(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        for limit in (1, 20):
+            with self.subTest(limit=limit):
+                cache.clear()
+                self.get_recipes(client, limit, self.AUTHENTICATED_QUERIES)
+
+
+class RecipeSearchTest(TestCase):
+    """?search= на PostgreSQL и на индексе в памяти для других баз."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            username='user', email='user@example.com'
+        )
+        breakfast, lunch = (
+            Tag.objects.create(name=name, color=color, slug=slug)
+            for name, color, slug in (
+                ('Завтрак', '#FBCEB1', 'breakfast'),
+                ('Обед', '#FAE7B5', 'lunch'),
+            )
+        )
+        pumpkin = Ingredient.objects.create(
+            name='тыква', measurement_unit='г'
+        )
+
+        def create(name, text, tag):
+            recipe = Recipe.objects.create(
+                author=cls.user, name=name, text=text, cooking_time=10,
+                image='recipes/images/recipe.png'
+            )
+            recipe.tags.set([tag])
+            return recipe
+
+        # Порядок создания не совпадает с порядком релевантности.
+        cls.by_name = create('Тыква печёная', 'Запечь', breakfast)
+        cls.by_text = create('Каша', 'Сварить с тыква', lunch)
+        cls.by_ingredient = create('Рагу', 'Потушить', breakfast)
+        RecipeIngredient.objects.create(
+            recipe=cls.by_ingredient, ingredient=pumpkin, amount=100
+        )
+        create('Омлет', 'Взбить яйца', breakfast)
+        Favorite.objects.create(user=cls.user, recipe=cls.by_text)
+        update_search_vectors()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, **params):
+        response = self.client.get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_ranking(self):
+        self.assertEqual(self.search(search='тыква'), [
+            self.by_name.id, self.by_ingredient.id, self.by_text.id
+        ])
+
+    def test_all_words(self):
+        self.assertEqual(
+            self.search(search='тыква рагу'), [self.by_ingredient.id]
+        )
+
+    def test_with_tags(self):
+        self.assertEqual(
+            self.search(search='тыква', tags='breakfast'),
+            [self.by_name.id, self.by_ingredient.id]
+        )
+
+    def test_with_is_favorited(self):
+        self.assertEqual(
+            self.search(search='тыква', is_favorited=1), [self.by_text.id]
+        )
+
+    def test_with_cursor(self):
+        response = self.client.get(
+            '/api/recipes/', {'search': 'тыква', 'cursor': ''}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('search', response.data)
+
+
+class ShoppingListTest(TestCase):
+    """Списки покупок после изменений через API совпадают с rebuild()."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.user, cls.other = (
+            CustomUser.objects.create(
+                username=name, email=f'{name}@example.com'
+            )
+            for name in ('author', 'user', 'other')
+        )
+        cls.tag = Tag.objects.create(
+            name='Завтрак', color='#FBCEB1', slug='breakfast'
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(5)
+        ]
+        cls.recipes = []
+        for number in range(4):
+            recipe = Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {number}', text='Описание',
+                cooking_time=10, image='recipes/images/recipe.png'
+            )
+            recipe.tags.set([cls.tag])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=cls.ingredients[number + shift],
+                    amount=10 * (shift + 1)
+                )
+                for shift in range(2)
+            )
+            cls.recipes.append(recipe)
+        CustomUser.objects.filter(id=cls.author.id).update(
+            recipes_count=len(cls.recipes)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        other = APIClient()
+        other.force_authenticate(self.other)
+        for recipe in self.recipes[:2]:
+            other.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+
+    @staticmethod
+    def items():
+        return sorted(UserShoppingListItem.objects.values_list(
+            'user_id', 'ingredient_id', 'amount'
+        ))
+
+    def assertMatchesRebuild(self):
+        materialized = self.items()
+        shopping_list.rebuild()
+        self.assertEqual(materialized, self.items())
+
+    def add(self, recipe):
+        response = self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        self.assertEqual(response.status_code, 201)
+
+    def test_add(self):
+        self.add(self.recipes[0])
+        self.add(self.recipes[1])
+        self.assertTrue(self.items())
+        self.assertMatchesRebuild()
+
+    def test_remove(self):
+        self.add(self.recipes[0])
+        self.add(self.recipes[1])
+        response = self.client.delete(
+            f'/api/recipes/{self.recipes[0].id}/shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertMatchesRebuild()
+
+    def test_batch(self):
+        ids = [recipe.id for recipe in self.recipes]
+        response = self.client.post(
+            '/api/recipes/shopping_cart/', {'recipes': ids}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertMatchesRebuild()
+        response = self.client.delete(
+            '/api/recipes/shopping_cart/', {'recipes': ids[1:3]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertMatchesRebuild()
+
+    def test_update_ingredients(self):
+        self.add(self.recipes[0])
+        recipe = self.recipes[0]
+        author = APIClient()
+        author.force_authenticate(self.author)
+        response = author.patch(f'/api/recipes/{recipe.id}/', {
+            'tags': [self.tag.id],
+            'ingredients': [
+                {'id': self.ingredients[0].id, 'amount': 25},
+                {'id': self.ingredients[4].id, 'amount': 5},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertMatchesRebuild()
+
+    def test_delete_recipe(self):
+        self.add(self.recipes[0])
+        self.add(self.recipes[2])
+        author = APIClient()
+        author.force_authenticate(self.author)
+        response = author.delete(f'/api/recipes/{self.recipes[0].id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertMatchesRebuild()
+
+    def test_drift(self):
+        self.add(self.recipes[0])
+        self.add(self.recipes[1])
+        UserShoppingListItem.objects.filter(user=self.user).delete()
+        with self.assertLogs('recipes.shopping_list', 'WARNING'):
+            self.client.delete(
+                f'/api/recipes/{self.recipes[1].id}/shopping_cart/'
+            )
+        self.assertTrue(
+            UserShoppingListItem.objects.filter(user=self.user).exists()
+        )
+        self.assertMatchesRebuild()
+
+
+@skipIf(orjson is None, 'orjson не установлен')
+class FastJSONRendererTest(TestCase):
+    """Ответ orjson побайтно совпадает с ответом JSONRenderer DRF."""
+
+    def test_same_bytes(self):
+        data = {
+            'created': timezone.now(),
+            'naive': datetime.datetime(2022, 12, 21, 10, 30, 15, 123456),
+            'date': datetime.date(2022, 12, 21),
+            'time': datetime.time(10, 30, 15, 123456),
+            'amount': Decimal('1.50'),
+            'text': 'Суп\u2028борщ',
+            1: [None, True, 2.5],
+        }
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
@@ -0,0 +1,49 @@
+import csv
+
+from recipes.models import UserShoppingListItem
+from recipes.units import merge_units
+
+
+def shopping_cart_rows(user):
+    return UserShoppingListItem.objects.filter(user=user).values(
+        'ingredient__name', 'ingredient__measurement_unit', 'amount'
+    )
+
+
+def shopping_cart_ingredients(user):
+    """Ингредиенты корзины из готового списка покупок со сведением единиц."""
+    return merge_units(shopping_cart_rows(user).iterator())
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def shopping_cart_txt(ingredients):
+    yield 'Список покупок:\n--------------\n'
+    for position, ingredient in enumerate(ingredients, start=1):
+        yield (
+            f'{position}. {ingredient["ingredient__name"]}:'
+            f' {ingredient["amount"]}'
+            f' ({ingredient["ingredient__measurement_unit"]})\n'
+        )
+
+
+def shopping_cart_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Количество', 'Единица измерения'))
+    for ingredient in ingredients:
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['amount'],
+            ingredient['ingredient__measurement_unit'],
+        ))
+
+
+SHOPPING_CART_FORMATS = {
+    'txt': (shopping_cart_txt, 'text/plain; charset=utf-8'),
+    'csv': (shopping_cart_csv, 'text/csv; charset=utf-8'),
+}
@@ -1,25 +1,53 @@
-from django.db.models import Sum
-from django.http import HttpResponse
-from django.shortcuts import get_list_or_404, get_object_or_404
+from django.db import transaction
+from django.db.models import (Count, F, Max, OuterRef, Prefetch, Subquery,
+                              Sum, Value)
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import filters, mixins, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
-from recipes.models import (Favorite, Recipe, Ingredient,RecipeIngredient,
-                            ShoppingCart, Tag)
+from recipes import shopping_list
+from recipes.models import (Favorite, Recipe, Ingredient, ShoppingCart, Tag,
+                            UserShoppingListItem)
 from users.models import CustomUser, Follow
+from .cache import CachedResponseMixin
+from .feed import RecipeFeed
+from .memberships import Memberships
 from .filters import IngredientFilter, RecipeFilter
+from .pagination import RecipePagination
 from .permissions import IsAdminOrReadOnly
 from .serializers import (CustomUserSerializer, FavoriteSerializer,
                           FollowSerializer, RecipeCreateSerializer, RecipeGetSerializer,
+                          RecipeIdsSerializer, ShoppingListItemSerializer,
                           ShoppingCartSerializer, TagSerializer,IngredientSerializer)
+from .utils import SHOPPING_CART_FORMATS, shopping_cart_ingredients
 # Ingredient,RecipeIngredient,
 # IngredientSerializer,
 
 
+def shopping_cart_etag(request, *args, **kwargs):
+    """ETag списка покупок по сводке его строк без их выгрузки."""
+    if request.user.is_anonymous:
+        return None
+    state = UserShoppingListItem.objects.filter(
+        user=request.user
+    ).aggregate(
+        count=Count('id'),
+        last=Max('id'),
+        total=Sum('amount'),
+        checksum=Sum(F('amount') * F('ingredient_id'))
+    )
+    file_format = request.GET.get('type', 'txt')
+    return '{}-{count}-{last}-{total}-{checksum}'.format(file_format, **state)
+
+
 class ListCreateDeleteViewSet(
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
@@ -32,16 +60,15 @@ class ListCreateDeleteViewSet(
     search_fields = ('=name',)
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Ingredient.objects.all().order_by('name')
     serializer_class = IngredientSerializer
     filter_backends = [IngredientFilter, ]
-    search_fields = ['^name']
     permission_classes = [permissions.AllowAny]
     pagination_class = None
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly, )
@@ -53,6 +80,12 @@ class RecipeViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filter_class = RecipeFilter
+    pagination_class = RecipePagination
+
+    def get_queryset(self):
+        return Recipe.objects.select_related('author').prefetch_related(
+            'tags', 'recipe_ingredients__ingredient'
+        ).order_by('-id')
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -64,22 +97,86 @@ class RecipeViewSet(viewsets.ModelViewSet):
         context.update({'request': self.request})
         return context
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            shopping_list.delete_recipe(instance)
+            CustomUser.objects.filter(id=instance.author_id).update(
+                recipes_count=F('recipes_count') - 1
+            )
+
     @staticmethod
-    def post_or_delete(request, model, serializer, pk):
+    @transaction.atomic
+    def post_or_delete(request, model, serializer, pk, counter_field):
+        # Повторный запрос ждёт коммита первого и видит его результат,
+        # иначе оба изменят счётчик и список покупок.
+        shopping_list.lock_users([request.user.id])
+        recipes = Recipe.objects.filter(id=pk)
+        Memberships.invalidate(request.user.id, model)
         if request.method != 'POST':
             get_object_or_404(
                 model,
                 user=request.user,
                 recipe=get_object_or_404(Recipe, id=pk)
             ).delete()
+            if model is ShoppingCart:
+                shopping_list.remove_recipes(request.user.id, [pk])
+            recipes.update(**{counter_field: F(counter_field) - 1})
             return Response(status=status.HTTP_204_NO_CONTENT)
         serializer = serializer(
             data={'user': request.user.id, 'recipe': pk},
             context={'request': request})
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        if model is ShoppingCart:
+            shopping_list.add_recipes(request.user.id, [pk])
+        recipes.update(**{counter_field: F(counter_field) + 1})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @staticmethod
+    @transaction.atomic
+    def post_or_delete_many(request, model, counter_field):
+        """Добавление или удаление списка рецептов одним запросом."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['recipes']))
+        shopping_list.lock_users([request.user.id])
+        found = set(
+            Recipe.objects.filter(id__in=ids).values_list('id', flat=True)
+        )
+        user_recipes = model.objects.filter(user=request.user)
+        present = set(user_recipes.filter(
+            recipe_id__in=found
+        ).values_list('recipe_id', flat=True))
+        if request.method == 'POST':
+            changed = found - present
+            model.objects.bulk_create(
+                [model(user=request.user, recipe_id=pk) for pk in changed],
+                ignore_conflicts=True
+            )
+            delta, done, skipped = 1, 'added', 'exists'
+        else:
+            changed = present
+            user_recipes.filter(recipe_id__in=changed).delete()
+            delta, done, skipped = -1, 'removed', 'absent'
+        if changed:
+            Recipe.objects.filter(id__in=changed).update(
+                **{counter_field: F(counter_field) + delta}
+            )
+            Memberships.invalidate(request.user.id, model)
+            if model is ShoppingCart:
+                (shopping_list.add_recipes if delta > 0
+                 else shopping_list.remove_recipes)(request.user.id, changed)
+        return Response({'results': [
+            {
+                'id': pk,
+                'status': (
+                    'not_found' if pk not in found
+                    else done if pk in changed else skipped
+                )
+            }
+            for pk in ids
+        ]})
+
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
@@ -90,7 +187,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
             request,
             Favorite,
             FavoriteSerializer,
-            pk
+            pk,
+            'favorites_count'
         )
 
     @action(
@@ -103,33 +201,92 @@ class RecipeViewSet(viewsets.ModelViewSet):
             request,
             ShoppingCart,
             ShoppingCartSerializer,
-            pk
+            pk,
+            'in_carts_count'
+        )
+
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        url_path='favorite',
+        url_name='favorite-batch',
+        permission_classes=(permissions.IsAuthenticated,)
+    )
+    def favorite_batch(self, request):
+        return self.post_or_delete_many(request, Favorite, 'favorites_count')
+
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        url_path='shopping_cart',
+        url_name='shopping-cart-batch',
+        permission_classes=(permissions.IsAuthenticated,)
+    )
+    def shopping_cart_batch(self, request):
+        return self.post_or_delete_many(
+            request, ShoppingCart, 'in_carts_count'
         )
 
-    # @action(
-    #     detail=False,
-    #     methods=['GET'],
-    #     permission_classes=(permissions.IsAuthenticated,)
-    # )
-    # def download_shopping_cart(self, request, pk=None):
-    #     ingredients = RecipeIngredient.objects.filter(
-    #         recipe__shopping_cart__user=request.user.id
-    #     ).values(
-    #         'ingredient__name',
-    #         'ingredient__measurement_unit'
-    #     ).annotate(amount=Sum('amount'))
-    #     shopping_cart = ['Список покупок:\n--------------']
-    #     for position, ingredient in enumerate(ingredients, start=1):
-    #         shopping_cart.append(
-    #             f'\n{position}. {ingredient["ingredient__name"]}:'
-    #             f' {ingredient["amount"]}'
-    #             f'({ingredient["ingredient__measurement_unit"]})'
-    #         )
-    #     response = HttpResponse(shopping_cart, content_type='text')
-    #     response['Content-Disposition'] = (
-    #         'attachment;filename=shopping_cart.pdf'
-    #     )
-    #     return response
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=(permissions.IsAuthenticated,)
+    )
+    def feed(self, request):
+        params = request.query_params
+        before = params.get('before')
+        before = int(before) if before and before.isdigit() else None
+        limit = params.get('limit', '')
+        limit = min(int(limit) if limit.isdigit() else 0, 100) or (
+            self.paginator.page_size
+        )
+        ids = RecipeFeed(request.user).page(before, limit)
+        recipes = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for recipe_id in ids if recipe_id in recipes],
+            many=True
+        )
+        next_url = None
+        if len(ids) == limit:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), 'before', ids[-1]
+            )
+        return Response({'next': next_url, 'results': serializer.data})
+
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=(permissions.IsAuthenticated,)
+    )
+    @method_decorator(condition(etag_func=shopping_cart_etag))
+    def shopping_list(self, request):
+        return Response(ShoppingListItemSerializer(
+            shopping_cart_ingredients(request.user), many=True
+        ).data)
+
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=(permissions.IsAuthenticated,)
+    )
+    @method_decorator(condition(etag_func=shopping_cart_etag))
+    def download_shopping_cart(self, request):
+        file_format = request.query_params.get('type', 'txt')
+        if file_format not in SHOPPING_CART_FORMATS:
+            return Response(
+                {'type': f'Доступные форматы: '
+                         f'{", ".join(SHOPPING_CART_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        writer, content_type = SHOPPING_CART_FORMATS[file_format]
+        response = StreamingHttpResponse(
+            writer(shopping_cart_ingredients(request.user)),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment;filename=shopping_cart.{file_format}'
+        )
+        return response
 
 
 class CustomUserViewSet(UserViewSet):
@@ -142,20 +299,51 @@ class FollowViewSet(viewsets.ModelViewSet):
     serializer_class = FollowSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_recipes_limit(self):
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            return int(recipes_limit)
+        return None
+
     def get_queryset(self):
-        return get_list_or_404(CustomUser, following__user=self.request.user)
+        recipes = Recipe.objects.order_by('id')
+        recipes_limit = self.get_recipes_limit()
+        if recipes_limit is not None:
+            recipes = recipes.filter(id__in=Subquery(
+                Recipe.objects.filter(
+                    author_id=OuterRef('author_id')
+                ).order_by('id').values('id')[:recipes_limit]
+            ))
+        return CustomUser.objects.filter(
+            following__user=self.request.user
+        ).annotate(
+            is_subscribed=Value(True)
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='short_recipes')
+        ).order_by('id')
 
     def create(self, request, *args, **kwargs):
         user_id = self.kwargs.get('user_id')
         user = get_object_or_404(CustomUser, id=user_id)
-        Follow.objects.create(
-            user=request.user, following=user)
-        return Response(status.HTTP_201_CREATED)
+        with transaction.atomic():
+            Follow.objects.create(
+                user=request.user, following=user)
+            RecipeFeed.invalidate(request.user.id)
+            CustomUser.objects.filter(id=user.id).update(
+                followers_count=F('followers_count') + 1
+            )
+        serializer = self.get_serializer(self.get_queryset().get(id=user.id))
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, *args, **kwargs):
         author_id = self.kwargs['user_id']
         user_id = request.user.id
         subscribe = get_object_or_404(
             Follow, user__id=user_id, following__id=author_id)
-        subscribe.delete()
+        with transaction.atomic():
+            subscribe.delete()
+            RecipeFeed.invalidate(user_id)
+            CustomUser.objects.filter(id=author_id).update(
+                followers_count=F('followers_count') - 1
+            )
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -32,6 +32,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.instrumentation.InstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,10 +70,23 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
+        # PgBouncer в режиме transaction не сохраняет курсоры между
+        # транзакциями, а iterator() на PostgreSQL использует серверные.
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            os.getenv('DB_PGBOUNCER', default='False') == 'True'
+        ),
     }
 }
 
+DB_CONN_HEALTH_CHECKS = (
+    os.getenv('DB_CONN_HEALTH_CHECKS', default='True') == 'True'
+)
+DB_HEALTH_CHECK_INTERVAL = int(
+    os.getenv('DB_HEALTH_CHECK_INTERVAL', default=30)
+)
+
 # DATABASES = {
 #     'default': {
 #         'ENGINE': 'django.db.backends.sqlite3',
@@ -80,6 +94,20 @@ DATABASES = {
 #     }
 # }
 
+# В docker-compose кэш — общий Redis: поколения данных (recipes.cache)
+# должны видеть все процессы сервера и команды manage.py.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
+    }
+}
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', default=3600))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -114,7 +142,16 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -122,6 +159,29 @@ REST_FRAMEWORK = {
 
 }
 
+INSTRUMENTATION = {
+    'HEADERS': DEBUG,
+    'METRICS': os.getenv('INSTRUMENTATION_METRICS', default='True') == 'True',
+    'SLOW_REQUEST_MS': int(os.getenv('SLOW_REQUEST_MS', default=500)),
+    'REPEATED_QUERY_THRESHOLD': 5,
+}
+
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', default=2))
+IMAGE_WEBP_QUALITY = 80
+
+AUTH_TOKEN_CACHE_TIMEOUT = 60
+MEMBERSHIP_CACHE_TIMEOUT = 10 * 60
+BATCH_RECIPES_LIMIT = 100
+
+FEED_SIZE = 500
+FEED_TIMEOUT = 24 * 60 * 60
+
+INGREDIENTS_SEARCH_LIMIT = 20
+INGREDIENTS_CATALOGUE_CACHE = True
+
+SEARCH_CONFIG = 'russian'
+
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:3000',
 ]
@@ -3,8 +3,11 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from api.instrumentation import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics/', metrics, name='metrics'),
     path('api/', include('api.urls')),
     path('api/auth/', include('djoser.urls.authtoken')),
     path('', include('djoser.urls')),
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Favorite, Recipe, Ingredient, ShoppingCart, Tag
+from .search import recipe_search
 
 # Ingredient,
 
@@ -14,19 +15,23 @@ class RecipeIngredientAdmin(admin.TabularInline):
 class RecipeAdmin(admin.ModelAdmin):
     inlines = [RecipeIngredientAdmin]
     list_display = (
-        'id', 'name', 'author', 'text'
+        'id', 'name', 'author', 'text', 'favorites_count', 'in_carts_count'
     )
     list_filter = ('author', 'name', 'tags')
     filter_vertical = ('tags', )
     search_fields = ('name', )
     empty_value_display = 'пусто'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return recipe_search.filter(queryset, search_term.strip()), False
+
 
 class IngredientAdmin(admin.ModelAdmin):
     list_display = (
-        'id', 'name'
+        'id', 'name', 'measurement_unit'
     )
-    # 'measurement_unit'
     search_fields = ('name', )
     list_filter = ('name', )
     empy_value_display = '-пусто-'
@@ -0,0 +1,29 @@
+import time
+
+from django.core.cache import cache
+
+
+def generation_key(name):
+    return f'generation:{name}'
+
+
+def get_generation(name, timeout=None):
+    """Текущее поколение данных модели, меняется при каждом изменении.
+
+    С timeout забытое поколение заменяется новым, и зависящие от него
+    записи кэша просто перестают читаться.
+    """
+    key = generation_key(name)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), timeout)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(name):
+    key = generation_key(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
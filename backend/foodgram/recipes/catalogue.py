@@ -0,0 +1,119 @@
+import bisect
+import sys
+import threading
+from array import array
+
+from .cache import get_generation
+from .models import Ingredient, Tag
+
+
+class IngredientSnapshot:
+    """Неизменяемый снимок справочника, отсортированный по имени.
+
+    Отсортированный массив ключей работает как префиксное дерево:
+    все имена с общим префиксом лежат подряд, и их диапазон находится
+    двумя бинарными поисками без хранения узлов дерева в памяти.
+    """
+
+    def __init__(self, version, rows):
+        rows = sorted(rows, key=lambda row: (row[1].lower(), row[0]))
+        self.version = version
+        self.keys = [name.lower() for _, name, _ in rows]
+        self.ids = array('q', (ingredient_id for ingredient_id, _, _ in rows))
+        self.names = [name for _, name, _ in rows]
+        self.units = [unit for _, _, unit in rows]
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def nbytes(self):
+        """Приблизительный объём памяти снимка в байтах."""
+        return (
+            sys.getsizeof(self.keys) + sys.getsizeof(self.names)
+            + sys.getsizeof(self.units) + self.ids.buffer_info()[1]
+            * self.ids.itemsize
+            + sum(sys.getsizeof(key) for key in self.keys)
+            + sum(sys.getsizeof(name) for name in self.names)
+            + sum(sys.getsizeof(unit) for unit in set(self.units))
+        )
+
+    def prefix_range(self, prefix):
+        return (
+            bisect.bisect_left(self.keys, prefix),
+            bisect.bisect_right(self.keys, prefix + '\U0010ffff'),
+        )
+
+    def search(self, query, limit):
+        query = query.lower()
+        start, stop = self.prefix_range(query)
+        found = list(range(start, min(stop, start + limit)))
+        if len(found) < limit:
+            for position, key in enumerate(self.keys):
+                if start <= position < stop or query not in key:
+                    continue
+                found.append(position)
+                if len(found) == limit:
+                    break
+        return [
+            Ingredient(
+                id=self.ids[position],
+                name=self.names[position],
+                measurement_unit=self.units[position],
+            )
+            for position in found
+        ]
+
+
+class IngredientCatalogue:
+    """Справочник ингредиентов в памяти процесса.
+
+    Версия снимка — поколение модели в кэше Django, поэтому при общем
+    кэше сброс в одном процессе заставляет перечитать данные остальные.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        version = get_generation(Ingredient._meta.model_name)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = IngredientSnapshot(
+                    version,
+                    Ingredient.objects.values_list(
+                        'id', 'name', 'measurement_unit'
+                    ).iterator()
+                )
+            return self._snapshot
+
+    def search(self, query, limit):
+        return self.snapshot().search(query, limit)
+
+
+ingredient_catalogue = IngredientCatalogue()
+
+
+class TagCatalogue:
+    """Соответствие slug -> id тэгов, сбрасывается вместе с поколением."""
+
+    def __init__(self):
+        self._snapshot = (None, {})
+
+    def ids_by_slug(self):
+        version = get_generation(Tag._meta.model_name)
+        snapshot_version, ids = self._snapshot
+        if snapshot_version != version:
+            ids = dict(Tag.objects.values_list('slug', 'id'))
+            self._snapshot = (version, ids)
+        return ids
+
+    def choices(self):
+        return [(slug, slug) for slug in self.ids_by_slug()]
+
+
+tag_catalogue = TagCatalogue()
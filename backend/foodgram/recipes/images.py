@@ -0,0 +1,57 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS = {
+    'thumbnail': (320, 320),
+    'medium': (960, 960),
+}
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_WORKERS,
+    thread_name_prefix='renditions'
+)
+
+
+def rendition_name(name, rendition):
+    return f'{os.path.splitext(name)[0]}.{rendition}.webp'
+
+
+def rendition_url(name, rendition):
+    """URL уменьшенной копии, не обращаясь к хранилищу.
+
+    Пока копия не готова, nginx отдаёт по этому адресу оригинал.
+    """
+    return default_storage.url(rendition_name(name, rendition))
+
+
+def make_renditions(name):
+    try:
+        with default_storage.open(name) as file:
+            image = Image.open(file)
+            image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        for rendition, size in RENDITIONS.items():
+            target = rendition_name(name, rendition)
+            if default_storage.exists(target):
+                continue
+            copy = image.copy()
+            copy.thumbnail(size)
+            buffer = BytesIO()
+            copy.save(buffer, 'WEBP', quality=settings.IMAGE_WEBP_QUALITY)
+            default_storage.save(target, ContentFile(buffer.getvalue()))
+    except Exception:
+        logger.exception('Не удалось подготовить копии изображения %s', name)
+
+
+def schedule_renditions(name):
+    return executor.submit(make_renditions, name)
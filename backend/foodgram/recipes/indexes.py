@@ -0,0 +1,45 @@
+from django.db import connections
+
+from .models import Recipe
+
+# Индексы, которых нет в Meta моделей: имя, модель, столбцы, определение
+# и СУБД, на которой индекс нужен (None — на любой).
+INDEXES = (
+    (
+        'recipe_tag_tag_recipe_idx', Recipe.tags.through,
+        ('tag_id', 'recipe_id'), '(tag_id, recipe_id DESC)', None,
+    ),
+    (
+        'recipe_search_vector_idx', Recipe,
+        ('search_vector',), 'USING gin (search_vector)', 'postgresql',
+    ),
+)
+
+
+def create_indexes(using='default', **kwargs):
+    """Создать недостающие индексы после migrate.
+
+    Миграции recipes генерируются при деплое и в репозитории не хранятся,
+    поэтому миграция с такими индексами не может надёжно встать после
+    той, что создаёт их таблицы. Сигнал post_migrate приходит, когда
+    все миграции уже применены, а CREATE INDEX IF NOT EXISTS не трогает
+    существующие индексы.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        tables = set(connection.introspection.table_names(cursor))
+        for name, model, columns, definition, vendor in INDEXES:
+            table = model._meta.db_table
+            if vendor not in (None, connection.vendor) or table not in tables:
+                continue
+            existing = {
+                column.name for column in
+                connection.introspection.get_table_description(cursor, table)
+            }
+            if not existing.issuperset(columns):
+                continue
+            cursor.execute('CREATE INDEX IF NOT EXISTS {} ON {} {}'.format(
+                connection.ops.quote_name(name),
+                connection.ops.quote_name(table),
+                definition
+            ))
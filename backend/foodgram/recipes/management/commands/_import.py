@@ -0,0 +1,98 @@
+import csv
+import os
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.cache import bump_generation
+
+DATA_ROOT = os.path.join(settings.BASE_DIR, 'data')
+
+
+class BaseImportCommand(BaseCommand):
+    """Пакетная загрузка CSV: чтение потоком, дедупликация, bulk_create."""
+
+    model = None
+    default_filename = None
+    fields = ()
+    unique_fields = ()
+
+    def add_arguments(self, parser):
+        parser.add_argument('filename', default=self.default_filename,
+                            nargs='?', type=str)
+        parser.add_argument('--batch-size', default=1000, type=int,
+                            help='Количество строк в одной вставке')
+        parser.add_argument('--upsert', action='store_true',
+                            help='Обновлять уже существующие записи')
+
+    def clean_row(self, row):
+        return dict(zip(self.fields, (value.strip() for value in row)))
+
+    def read_objects(self, file):
+        seen = set()
+        for row in csv.reader(file):
+            if not row:
+                continue
+            values = self.clean_row(row)
+            key = tuple(values[field] for field in self.unique_fields)
+            if key in seen:
+                continue
+            seen.add(key)
+            yield self.model(**values)
+
+    def save_batch(self, batch, upsert):
+        update_fields = [
+            field for field in self.fields
+            if field not in self.unique_fields
+        ]
+        if not upsert or not update_fields:
+            self.model.objects.bulk_create(batch, ignore_conflicts=True)
+            return
+        key = self.unique_fields[0]
+        existing = self.model.objects.in_bulk(
+            [getattr(obj, key) for obj in batch], field_name=key
+        )
+        for obj in batch:
+            current = existing.get(getattr(obj, key))
+            if current is not None:
+                obj.pk = current.pk
+        self.model.objects.bulk_update(
+            [obj for obj in batch if obj.pk is not None], update_fields
+        )
+        self.model.objects.bulk_create(
+            [obj for obj in batch if obj.pk is None], ignore_conflicts=True
+        )
+
+    def handle(self, *args, **options):
+        filename = options['filename']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        before = self.model.objects.count()
+        started = time.monotonic()
+        processed = 0
+        try:
+            with open(os.path.join(DATA_ROOT, filename), 'r',
+                      encoding='utf-8') as file:
+                objects = self.read_objects(file)
+                batch = list(islice(objects, batch_size))
+                while batch:
+                    with transaction.atomic():
+                        self.save_batch(batch, options['upsert'])
+                    processed += len(batch)
+                    batch = list(islice(objects, batch_size))
+        except FileNotFoundError:
+            raise CommandError(
+                f'В каталоге "data" отсутствует файл {filename}'
+            )
+        bump_generation(self.model._meta.model_name)
+        elapsed = time.monotonic() - started
+        created = self.model.objects.count() - before
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано строк: {processed}, добавлено: {created} '
+            f'за {elapsed:.2f} с ({processed / max(elapsed, 1e-6):.0f} '
+            f'строк/с)'
+        ))
@@ -0,0 +1,54 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.images import RENDITIONS, rendition_name
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Удаление изображений, на которые не ссылается ни один рецепт'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, что будет удалено')
+        parser.add_argument('--min-age', default=3600, type=int,
+                            help='Не трогать файлы моложе стольких секунд')
+
+    def referenced_names(self):
+        referenced = set()
+        names = Recipe.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).values_list('image', flat=True)
+        for name in names.iterator():
+            referenced.add(name)
+            referenced.update(
+                rendition_name(name, rendition) for rendition in RENDITIONS
+            )
+        return referenced
+
+    def handle(self, *args, **options):
+        field = Recipe._meta.get_field('image')
+        directory = field.upload_to
+        root = field.storage.path(directory)
+        if not os.path.isdir(root):
+            return
+        referenced = self.referenced_names()
+        now = time.time()
+        removed = freed = 0
+        for entry in os.scandir(root):
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            name = os.path.join(directory, entry.name).replace('\\', '/')
+            if name in referenced or now - stat.st_mtime < options['min_age']:
+                continue
+            removed += 1
+            freed += stat.st_size
+            if not options['dry_run']:
+                os.remove(entry.path)
+        self.stdout.write(
+            f'Удалено файлов: {removed}, освобождено {freed} байт'
+            + (' (пробный запуск)' if options['dry_run'] else '')
+        )
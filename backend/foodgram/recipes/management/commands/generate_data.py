@@ -0,0 +1,160 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.cache import bump_generation
+from recipes.models import (CHOICES, Favorite, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag)
+from users.models import CustomUser, Follow
+
+TAGS = (('Завтрак', 'breakfast'), ('Обед', 'lunch'), ('Ужин', 'dinner'))
+UNITS = ('г', 'кг', 'мл', 'л', 'шт.', 'ст. л.', 'ч. л.', 'стакан')
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерация воспроизводимых синтетических данных '
+        'для нагрузочных тестов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', default=100, type=int)
+        parser.add_argument('--recipes', default=1000, type=int)
+        parser.add_argument('--ingredients', default=500, type=int)
+        parser.add_argument('--follows', default=10, type=int,
+                            help='Подписок на пользователя')
+        parser.add_argument('--favorites', default=20, type=int,
+                            help='Избранных рецептов на пользователя')
+        parser.add_argument('--carts', default=5, type=int,
+                            help='Рецептов в списке покупок на пользователя')
+        parser.add_argument('--seed', default=42, type=int)
+        parser.add_argument('--batch-size', default=1000, type=int)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = f'bench{options["seed"]}_'
+        if CustomUser.objects.filter(
+                username__startswith=self.prefix).exists():
+            raise CommandError(
+                f'Данные с seed={options["seed"]} уже сгенерированы'
+            )
+        if options['users'] < 1:
+            raise CommandError('--users должен быть больше нуля')
+        started = time.monotonic()
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            tags = self.create_tags()
+            ingredients = self.create_ingredients(options['ingredients'])
+            recipes = self.create_recipes(
+                options['recipes'], users, tags, ingredients
+            )
+            self.create_follows(users, options['follows'])
+            self.create_user_recipes(Favorite, users, recipes,
+                                     options['favorites'])
+            self.create_user_recipes(ShoppingCart, users, recipes,
+                                     options['carts'])
+        call_command('recount_counters', stdout=self.stdout)
+        call_command('update_search_vectors', stdout=self.stdout)
+        call_command('rebuild_shopping_lists', stdout=self.stdout)
+        bump_generation(Ingredient._meta.model_name)
+        bump_generation(Tag._meta.model_name)
+        self.stdout.write(self.style.SUCCESS(
+            f'Сгенерировано за {time.monotonic() - started:.2f} с: '
+            f'пользователей {len(users)}, рецептов {len(recipes)}, '
+            f'ингредиентов {len(ingredients)}'
+        ))
+
+    def bulk_create(self, model, objects):
+        model.objects.bulk_create(
+            objects, batch_size=self.batch_size, ignore_conflicts=True
+        )
+
+    def create_users(self, count):
+        password = make_password(self.prefix)
+        self.bulk_create(CustomUser, [
+            CustomUser(
+                username=f'{self.prefix}{number}',
+                email=f'{self.prefix}{number}@example.com',
+                first_name=f'Имя {number}',
+                last_name=f'Фамилия {number}',
+                password=password,
+            )
+            for number in range(count)
+        ])
+        return list(CustomUser.objects.filter(
+            username__startswith=self.prefix
+        ).order_by('id').values_list('id', flat=True))
+
+    def create_tags(self):
+        self.bulk_create(Tag, [
+            Tag(name=name, color=color, slug=slug)
+            for (name, slug), (color, _) in zip(TAGS, CHOICES)
+        ])
+        return list(Tag.objects.order_by('id').values_list('id', flat=True))
+
+    def create_ingredients(self, count):
+        self.bulk_create(Ingredient, [
+            Ingredient(
+                name=f'{self.prefix}ингредиент {number}',
+                measurement_unit=self.rng.choice(UNITS),
+            )
+            for number in range(count)
+        ])
+        return list(Ingredient.objects.filter(
+            name__startswith=self.prefix
+        ).order_by('id').values_list('id', flat=True))
+
+    def create_recipes(self, count, users, tags, ingredients):
+        self.bulk_create(Recipe, [
+            Recipe(
+                author_id=self.rng.choice(users),
+                name=f'{self.prefix}рецепт {number}',
+                text=f'Описание рецепта {number}',
+                cooking_time=self.rng.randint(1, 180),
+            )
+            for number in range(count)
+        ])
+        recipes = list(Recipe.objects.filter(
+            author_id__in=users
+        ).order_by('id').values_list('id', flat=True))
+        self.bulk_create(Recipe.tags.through, [
+            Recipe.tags.through(recipe_id=recipe, tag_id=tag)
+            for recipe in recipes
+            for tag in self.rng.sample(tags, self.rng.randint(1, len(tags)))
+        ])
+        if ingredients:
+            self.bulk_create(RecipeIngredient, [
+                RecipeIngredient(
+                    recipe_id=recipe,
+                    ingredient_id=ingredient,
+                    amount=self.rng.randint(1, 500),
+                )
+                for recipe in recipes
+                for ingredient in self.rng.sample(
+                    ingredients, min(len(ingredients), self.rng.randint(3, 10))
+                )
+            ])
+        return recipes
+
+    def create_follows(self, users, per_user):
+        follows = []
+        for user in users:
+            others = [other for other in users if other != user]
+            for following in self.rng.sample(
+                    others, min(per_user, len(others))):
+                follows.append(Follow(user_id=user, following_id=following))
+        self.bulk_create(Follow, follows)
+
+    def create_user_recipes(self, model, users, recipes, per_user):
+        self.bulk_create(model, [
+            model(user_id=user, recipe_id=recipe)
+            for user in users
+            for recipe in self.rng.sample(
+                recipes, min(per_user, len(recipes))
+            )
+        ])
@@ -1,32 +1,18 @@
-import csv
-import os
+from recipes.models import CHOICES, Tag
 
-from django.conf import settings
-from django.core.management.base import BaseCommand, CommandError
-from recipes.models import Tag
+from ._import import BaseImportCommand
 
-DATA_ROOT = os.path.join(settings.BASE_DIR, 'data')
+COLORS = {label: color for color, label in CHOICES}
 
 
-class Command(BaseCommand):
+class Command(BaseImportCommand):
+    help = 'Загрузка тэгов из CSV'
+    model = Tag
+    default_filename = 'tags.csv'
+    fields = ('name', 'color', 'slug')
+    unique_fields = ('slug',)
 
-    def add_arguments(self, parser):
-        parser.add_argument('filename', default='tags.csv', nargs='?',
-                            type=str)
-
-    def handle(self, *args, **options):
-        try:
-            with open(os.path.join(DATA_ROOT, options['filename']), 'r',
-                      encoding='utf-8') as file:
-                data = csv.reader(file)
-                for row in data:
-                    name, color, slug = row
-                    Tag.objects.get_or_create(
-                        name=name,
-                        color=color,
-                        slug=slug
-                    )
-        except FileNotFoundError:
-            raise CommandError(
-                'В каталоге "data" отсутствует файл ingredients.csv'
-            )
+    def clean_row(self, row):
+        values = super().clean_row(row)
+        values['color'] = COLORS.get(values['color'], values['color'])
+        return values
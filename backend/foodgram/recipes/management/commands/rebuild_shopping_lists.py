@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import UserShoppingListItem
+from recipes.shopping_list import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересборка списков покупок пользователей из корзин'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild()
+        count = UserShoppingListItem.objects.count()
+        self.stdout.write(f'Позиций в списках покупок: {count}')
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import CustomUser, Follow
+
+
+def count_of(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (CustomUser, 'recipes_count', Recipe, 'author'),
+    (CustomUser, 'followers_count', Follow, 'following'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт денормализованных счётчиков рецептов и пользователей'
+
+    def handle(self, *args, **options):
+        for model, counter, source, field in COUNTERS:
+            actual = count_of(source, field)
+            with transaction.atomic():
+                fixed = model.objects.exclude(**{counter: actual}).update(
+                    **{counter: actual}
+                )
+            self.stdout.write(
+                f'{model._meta.model_name}.{counter}: исправлено {fixed}'
+            )
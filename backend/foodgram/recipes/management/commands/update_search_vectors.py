@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from recipes.search import update_search_vectors, uses_postgres
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт поисковых векторов всех рецептов'
+
+    def handle(self, *args, **options):
+        update_search_vectors()
+        self.stdout.write(
+            'Поисковые векторы пересчитаны' if uses_postgres()
+            else 'Индекс в памяти будет перестроен при следующем поиске'
+        )
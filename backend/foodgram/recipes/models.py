@@ -1,8 +1,11 @@
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 from users.models import CustomUser
 
+from .storage import ContentAddressedStorage
+
 BREAKFAST = '#FBCEB1'
 LUNCH = '#FAE7B5'
 DINNER = '#9ACEEB'
@@ -41,25 +44,30 @@ class Tag(models.Model):
 
 
 class Ingredient(models.Model):
-    name = models.TextField(
+    name = models.CharField(
         'Название ингредиента',
-        max_length=256
+        max_length=256,
+        db_index=True
     )
-    # measurement_unit = models.TextField(
-    #     'Единица измерения',
-    #     max_length=256
-    # )
+    measurement_unit = models.TextField(
+        'Единица измерения',
+        max_length=256,
+        default=''
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент'
+        verbose_name_plural = 'Ингредиенты'
+
+        constraints = (
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='ingredient'
+            ),
+        )
 
-    # class Meta:
-    #     verbose_name = 'Ингредиент'
-    #     verbose_name_plural = 'Ингредиенты'
-    #
-    #     constraints = (
-    #         models.UniqueConstraint(
-    #             fields=['name', 'measurement_unit'],
-    #             name='ingredient'
-    #         ),
-    #     )
+    def __str__(self):
+        return f'{self.name}, {self.measurement_unit}'
 
 
 class Recipe(models.Model):
@@ -81,6 +89,7 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         upload_to='recipes/images/',
+        storage=ContentAddressedStorage(),
         null=True,
         default=None
     )
@@ -100,10 +109,31 @@ class Recipe(models.Model):
     text = models.TextField(
         'Текст рецепта'
     )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'В списках покупок',
+        default=0,
+        editable=False
+    )
+    # GIN-индекс на PostgreSQL создаёт recipes.indexes после migrate.
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = (
+            models.Index(
+                fields=['author', '-id'],
+                name='recipe_author_id_idx'
+            ),
+        )
 
 
 class RecipeIngredient(models.Model):
@@ -189,3 +219,32 @@ class ShoppingCart(models.Model):
                 name='unique_shopping_cart'
             ),
         )
+
+
+class UserShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='shopping_list'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент',
+        related_name='+'
+    )
+    amount = models.PositiveIntegerField(
+        'Количество',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списков покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            ),
+        )
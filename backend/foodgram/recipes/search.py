@@ -0,0 +1,141 @@
+import bisect
+import re
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, When
+
+from .cache import bump_generation, get_generation
+from .models import Recipe, RecipeIngredient
+
+GENERATION = 'search'
+WEIGHTS = {'A': 1.0, 'B': 0.4, 'C': 0.2}
+TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower().replace('ё', 'е'))
+
+
+def uses_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def ingredient_names():
+    return Subquery(
+        RecipeIngredient.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names')
+    )
+
+
+def update_search_vectors(recipe_ids=None):
+    """Пересчитать поисковые векторы рецептов, по умолчанию — всех."""
+    if uses_postgres():
+        recipes = Recipe.objects.all()
+        if recipe_ids is not None:
+            recipes = recipes.filter(id__in=recipe_ids)
+        config = settings.SEARCH_CONFIG
+        recipes.update(search_vector=(
+            SearchVector('name', weight='A', config=config)
+            + SearchVector(ingredient_names(), weight='B', config=config)
+            + SearchVector('text', weight='C', config=config)
+        ))
+    bump_generation(GENERATION)
+
+
+class SearchIndex:
+    """Инвертированный индекс рецептов для баз без полнотекстового поиска.
+
+    Термы хранятся в отсортированном списке, поэтому слово запроса
+    совпадает со всеми термами, которые с него начинаются, — это заменяет
+    стемминг. Вес вхождения зависит от поля: название, ингредиенты, текст.
+    """
+
+    def __init__(self, version, documents):
+        postings = defaultdict(lambda: defaultdict(float))
+        for recipe_id, weight, text in documents:
+            for token in tokenize(text):
+                postings[token][recipe_id] += WEIGHTS[weight]
+        self.version = version
+        self.terms = sorted(postings)
+        self.postings = [dict(postings[term]) for term in self.terms]
+
+    def lookup(self, prefix):
+        scores = defaultdict(float)
+        start = bisect.bisect_left(self.terms, prefix)
+        stop = bisect.bisect_right(self.terms, prefix + '\U0010ffff')
+        for position in range(start, stop):
+            for recipe_id, score in self.postings[position].items():
+                scores[recipe_id] += score
+        return scores
+
+    def search(self, query):
+        """id рецептов, содержащих все слова запроса, по убыванию веса."""
+        scores = None
+        for term in tokenize(query):
+            found = self.lookup(term)
+            if scores is not None:
+                found = {
+                    recipe_id: scores[recipe_id] + score
+                    for recipe_id, score in found.items()
+                    if recipe_id in scores
+                }
+            scores = found
+        if not scores:
+            return []
+        return sorted(scores, key=lambda recipe_id: (-scores[recipe_id],
+                                                     -recipe_id))
+
+
+class RecipeSearch:
+    """Поиск рецептов: tsvector на PostgreSQL, индекс в памяти на других БД."""
+
+    def __init__(self):
+        self._index = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def documents():
+        for recipe_id, name, text in Recipe.objects.values_list(
+                'id', 'name', 'text').iterator():
+            yield recipe_id, 'A', name
+            yield recipe_id, 'C', text
+        for recipe_id, name in RecipeIngredient.objects.values_list(
+                'recipe_id', 'ingredient__name').iterator():
+            yield recipe_id, 'B', name
+
+    def index(self):
+        version = get_generation(GENERATION)
+        index = self._index
+        if index is not None and index.version == version:
+            return index
+        with self._lock:
+            if self._index is None or self._index.version != version:
+                self._index = SearchIndex(version, self.documents())
+            return self._index
+
+    def filter(self, queryset, query):
+        if uses_postgres():
+            search_query = SearchQuery(query, config=settings.SEARCH_CONFIG)
+            return queryset.filter(search_vector=search_query).annotate(
+                rank=SearchRank(F('search_vector'), search_query)
+            ).order_by('-rank', '-id')
+        ids = self.index().search(query)
+        if not ids:
+            return queryset.none()
+        return queryset.filter(id__in=ids).order_by(Case(
+            *(When(id=recipe_id, then=position)
+              for position, recipe_id in enumerate(ids)),
+            output_field=IntegerField()
+        ))
+
+
+recipe_search = RecipeSearch()
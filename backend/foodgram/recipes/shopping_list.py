@@ -0,0 +1,141 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from users.models import CustomUser
+from .models import RecipeIngredient, ShoppingCart, UserShoppingListItem
+
+logger = logging.getLogger(__name__)
+
+
+def recipe_amounts(recipe_ids):
+    """Суммарное количество каждого ингредиента в рецептах."""
+    return dict(RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by().values('ingredient_id').annotate(
+        total=Sum('amount')
+    ).values_list('ingredient_id', 'total'))
+
+
+def cart_users(recipe_id):
+    return list(ShoppingCart.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('user_id', flat=True))
+
+
+def lock_users(user_ids):
+    """Заблокировать строки пользователей до конца транзакции.
+
+    Изменения списка покупок одного пользователя идут по очереди, иначе
+    два параллельных INSERT одной позиции нарушат уникальность.
+    Блокировки берутся в порядке id, чтобы не было взаимных блокировок.
+    """
+    list(CustomUser.objects.select_for_update().filter(
+        id__in=user_ids
+    ).order_by('id').values_list('id', flat=True))
+
+
+def apply_deltas(user_ids, deltas):
+    """Прибавить к спискам покупок пользователей изменения количества.
+
+    deltas — {id ингредиента: изменение}, одинаковое для всех
+    пользователей. Существующие строки меняются одним UPDATE, недостающие
+    создаются одним INSERT, обнулившиеся удаляются. Если количество
+    ушло бы в минус, список разошёлся с корзиной: такие пользователи
+    пишутся в лог, и их списки пересобираются.
+    """
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items() if delta
+    }
+    if not deltas or not user_ids:
+        return
+    with transaction.atomic():
+        lock_users(user_ids)
+        items = UserShoppingListItem.objects.filter(
+            user_id__in=user_ids, ingredient_id__in=deltas
+        )
+        existing = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in items.values_list(
+                'user_id', 'ingredient_id', 'amount'
+            )
+        }
+        drifted = {
+            user_id
+            for user_id in user_ids
+            for ingredient_id, delta in deltas.items()
+            if existing.get((user_id, ingredient_id), 0) + delta < 0
+        }
+        if drifted:
+            logger.warning(
+                'Список покупок разошёлся с корзиной у пользователей %s, '
+                'пересборка', sorted(drifted)
+            )
+            rebuild(drifted)
+            items = items.exclude(user_id__in=drifted)
+        if any(user_id not in drifted for user_id, _ in existing):
+            items.update(amount=F('amount') + Case(
+                *(When(ingredient_id=ingredient_id, then=Value(delta))
+                  for ingredient_id, delta in deltas.items()),
+                output_field=IntegerField()
+            ))
+            items.filter(amount=0).delete()
+        UserShoppingListItem.objects.bulk_create([
+            UserShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, amount=delta
+            )
+            for user_id in user_ids
+            if user_id not in drifted
+            for ingredient_id, delta in deltas.items()
+            if delta > 0 and (user_id, ingredient_id) not in existing
+        ])
+
+
+def add_recipes(user_id, recipe_ids):
+    apply_deltas([user_id], recipe_amounts(recipe_ids))
+
+
+def remove_recipes(user_id, recipe_ids):
+    apply_deltas([user_id], {
+        ingredient_id: -total
+        for ingredient_id, total in recipe_amounts(recipe_ids).items()
+    })
+
+
+def change_recipe(recipe_id, deltas):
+    """Учесть изменение состава рецепта в корзинах, где он лежит."""
+    apply_deltas(cart_users(recipe_id), deltas)
+
+
+def delete_recipe(recipe):
+    """Удалить рецепт и вычесть его ингредиенты из списков покупок."""
+    user_ids = cart_users(recipe.id)
+    deltas = {
+        ingredient_id: -total
+        for ingredient_id, total in recipe_amounts([recipe.id]).items()
+    }
+    recipe.delete()
+    apply_deltas(user_ids, deltas)
+
+
+def rebuild(user_ids=None):
+    """Пересобрать списки покупок из корзин, по умолчанию — все."""
+    carts = ShoppingCart.objects.all()
+    items = UserShoppingListItem.objects.all()
+    if user_ids is not None:
+        carts = carts.filter(user_id__in=user_ids)
+        items = items.filter(user_id__in=user_ids)
+    items.delete()
+    UserShoppingListItem.objects.bulk_create(
+        (
+            UserShoppingListItem(**row)
+            for row in RecipeIngredient.objects.filter(
+                recipe__shopping_cart__in=carts
+            ).order_by().values(
+                'ingredient_id', user_id=F('recipe__shopping_cart__user_id')
+            ).annotate(amount=Sum('amount')).iterator()
+        ),
+        batch_size=1000
+    )
@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_generation
+from .images import schedule_renditions
+from .models import Ingredient, Recipe, Tag
+from .search import GENERATION, update_search_vectors
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def bump_model_generation(sender, **kwargs):
+    name = sender._meta.model_name
+    transaction.on_commit(lambda: bump_generation(name))
+
+
+@receiver(post_save, sender=Recipe)
+def bump_recipe_generation(created, **kwargs):
+    if created:
+        transaction.on_commit(
+            lambda: bump_generation(Recipe._meta.model_name)
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(instance, **kwargs):
+    recipe_id = instance.id
+    transaction.on_commit(lambda: update_search_vectors([recipe_id]))
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_recipes_search(instance, created, **kwargs):
+    if not created:
+        recipes = Recipe.objects.filter(ingredients=instance).values('id')
+        transaction.on_commit(lambda: update_search_vectors(recipes))
+
+
+@receiver(post_delete, sender=Recipe)
+def drop_recipe_from_search(**kwargs):
+    transaction.on_commit(lambda: bump_generation(GENERATION))
+
+
+@receiver(post_save, sender=Recipe)
+def prepare_image_renditions(instance, **kwargs):
+    if instance.image:
+        name = instance.image.name
+        transaction.on_commit(lambda: schedule_renditions(name))
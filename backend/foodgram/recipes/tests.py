@@ -0,0 +1,62 @@
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery
+from django.db import connection
+from django.test import TestCase
+
+from users.models import CustomUser
+from .models import Recipe, Tag
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Нужен PostgreSQL')
+class RecipeFilterIndexesTest(TestCase):
+    """Запросы фильтров рецептов читают индексы, а не всю таблицу."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            username='user', email='user@example.com'
+        )
+        cls.tag = Tag.objects.create(
+            name='Завтрак', color='#FBCEB1', slug='breakfast'
+        )
+
+    def setUp(self):
+        # На почти пустых таблицах планировщик выбрал бы полный просмотр.
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+
+    def tearDown(self):
+        with connection.cursor() as cursor:
+            cursor.execute('RESET enable_seqscan')
+
+    def assertUsesIndex(self, queryset, *names):
+        plan = queryset.explain()
+        self.assertNotIn('Seq Scan', plan)
+        self.assertTrue(
+            any(name in plan for name in names),
+            f'Ни один из индексов {names} не используется:\n{plan}'
+        )
+
+    def test_author(self):
+        self.assertUsesIndex(
+            Recipe.objects.filter(author=self.user).order_by('-id')[:10],
+            'recipe_author_id_idx'
+        )
+
+    def test_tags(self):
+        self.assertUsesIndex(
+            Recipe.tags.through.objects.filter(
+                tag=self.tag
+            ).order_by('-recipe')[:10],
+            'recipe_tag_tag_recipe_idx'
+        )
+
+    def test_search(self):
+        self.assertUsesIndex(
+            Recipe.objects.filter(search_vector=SearchQuery(
+                'суп', config=settings.SEARCH_CONFIG
+            )),
+            'recipe_search_vector_idx'
+        )
@@ -0,0 +1,87 @@
+import re
+from decimal import Decimal
+from functools import lru_cache
+
+# Единица -> (базовая единица, множитель). Ключи в нормализованном виде.
+CONVERSIONS = {
+    'г': ('г', 1),
+    'гр': ('г', 1),
+    'грамм': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+    'ч л': ('мл', 5),
+    'чайная ложка': ('мл', 5),
+    'ст л': ('мл', 15),
+    'столовая ложка': ('мл', 15),
+    'стакан': ('мл', 250),
+    'шт': ('шт.', 1),
+    'штука': ('шт.', 1),
+}
+# Крупная единица для вывода суммы в базовых единицах.
+LARGER_UNITS = {
+    'г': ('кг', 1000),
+    'мл': ('л', 1000),
+}
+SEPARATORS = re.compile(r'[\s.]+')
+
+
+@lru_cache(maxsize=None)
+def normalize_unit(unit):
+    return SEPARATORS.sub(' ', unit.lower()).strip()
+
+
+@lru_cache(maxsize=None)
+def conversion(unit):
+    return CONVERSIONS.get(unit, (unit, 1))
+
+
+def normalize_name(name):
+    return ' '.join(name.lower().replace('ё', 'е').split())
+
+
+def format_amount(amount):
+    if isinstance(amount, int):
+        return amount
+    amount = amount.normalize()
+    return int(amount) if amount == amount.to_integral() else amount
+
+
+def merge_units(rows):
+    """Свести строки списка покупок с совместимыми единицами.
+
+    rows — результат группировки по названию и единице с суммой amount.
+    Один проход: название и единица нормализуются, совместимые единицы
+    переводятся в базовую, и суммы одного ингредиента складываются.
+    Если у ингредиента одна исходная единица, она остаётся как есть.
+    """
+    groups = {}
+    for row in rows:
+        name = row['ingredient__name']
+        unit = row['ingredient__measurement_unit']
+        normalized = normalize_unit(unit)
+        base, factor = conversion(normalized)
+        key = (normalize_name(name), base)
+        group = groups.get(key)
+        if group is None:
+            groups[key] = group = {
+                'name': name, 'unit': unit, 'units': set(), 'amount': 0,
+                'base_amount': 0,
+            }
+        group['units'].add(normalized)
+        group['amount'] += row['amount']
+        group['base_amount'] += row['amount'] * factor
+    merged = []
+    for (_, base), group in sorted(groups.items()):
+        amount, unit = group['amount'], group['unit']
+        if len(group['units']) > 1:
+            amount, unit = group['base_amount'], base
+            larger, factor = LARGER_UNITS.get(base, (None, None))
+            if larger and amount >= factor:
+                amount, unit = Decimal(amount) / factor, larger
+        merged.append({
+            'ingredient__name': group['name'],
+            'ingredient__measurement_unit': unit,
+            'amount': format_amount(amount),
+        })
+    return merged
@@ -5,7 +5,8 @@ from .models import CustomUser
 
 class CustomUserAdmin(admin.ModelAdmin):
     list_display = (
-        'username', 'first_name', 'last_name', 'email'
+        'username', 'first_name', 'last_name', 'email',
+        'recipes_count', 'followers_count'
     )
     search_fields = ('username', 'email', )
     list_filter = ('username', )
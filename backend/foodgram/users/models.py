@@ -11,6 +11,12 @@ class CustomUser(AbstractUser):
     first_name = models.CharField(max_length=150, blank=True)
     last_name = models.CharField(max_length=150, blank=True)
     email = models.EmailField(max_length=254, unique=True)
+    recipes_count = models.PositiveIntegerField(
+        'Рецептов', default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков', default=0, editable=False
+    )
 
 
 class Follow(models.Model):